@@ -12,6 +12,7 @@ WOWZA_HOME=${WOWZA_HOME:-"/usr/local/WowzaStreamingEngine"}
 BUILD_TOOL=${BUILD_TOOL:-"gradle"}  # "maven" or "gradle"
 APP_NAME=${APP_NAME:-"live"}
 BACKUP_CONFIG=${BACKUP_CONFIG:-"true"}
+LOG_OFFSET=0  # access log size before start_wowza, set by record_log_offset
 
 # Colors for output
 RED='\033[0;31m'
@@ -37,6 +38,28 @@ log_error() {
     echo -e "${RED}[ERROR]${NC} $1"
 }
 
+# Install a file atomically (same-directory temp file + rename),
+# skipping the copy when the destination is already identical.
+# Ownership and mode are always re-applied.
+install_file() {
+    local src="$1"
+    local dest="$2"
+    
+    if [ -f "$dest" ] && cmp -s "$src" "$dest"; then
+        log_info "Unchanged, skipping copy: $dest"
+        chown wowza:wowza "$dest"
+        chmod 644 "$dest"
+        return 0
+    fi
+    
+    # Remove the temp file if any step fails so it is not left in lib/ or conf/
+    local tmp="$dest.tmp.$$"
+    cp "$src" "$tmp" && \
+        chown wowza:wowza "$tmp" && \
+        chmod 644 "$tmp" && \
+        mv -f "$tmp" "$dest" || { rm -f "$tmp"; log_error "Failed to install $dest"; return 1; }
+}
+
 # Check prerequisites
 check_prerequisites() {
     log_info "Checking prerequisites..."
@@ -109,6 +132,18 @@ start_wowza() {
     return 1
 }
 
+# Remember the access log size before starting Wowza so verification only
+# looks at lines written by this start, not by a previous deploy
+record_log_offset() {
+    local access_log="$WOWZA_HOME/logs/wowzastreamingengine_access.log"
+    
+    if [ -f "$access_log" ]; then
+        LOG_OFFSET=$(wc -c < "$access_log")
+    else
+        LOG_OFFSET=0
+    fi
+}
+
 # Build the module
 build_module() {
     log_info "Building SCTE-35 SRT Detector module..."
@@ -133,12 +168,8 @@ build_module() {
 deploy_jar() {
     log_info "Deploying module JAR to Wowza..."
     
-    # Copy JAR to Wowza lib directory
-    cp "$MODULE_JAR" "$WOWZA_HOME/lib/"
-    
-    # Set proper ownership and permissions
-    chown wowza:wowza "$WOWZA_HOME/lib/$(basename $MODULE_JAR)"
-    chmod 644 "$WOWZA_HOME/lib/$(basename $MODULE_JAR)"
+    # Copy JAR to Wowza lib directory with proper ownership and permissions
+    install_file "$MODULE_JAR" "$WOWZA_HOME/lib/$(basename $MODULE_JAR)"
     
     log_success "Module JAR deployed to $WOWZA_HOME/lib/"
 }
@@ -181,9 +212,7 @@ deploy_config() {
     
     # Deploy configuration file
     if [ -f "deployment/conf/Application.xml" ]; then
-        cp "deployment/conf/Application.xml" "$config_file"
-        chown wowza:wowza "$config_file"
-        chmod 644 "$config_file"
+        install_file "deployment/conf/Application.xml" "$config_file"
         log_success "Configuration deployed to: $config_file"
     else
         log_warning "Configuration template not found, manual configuration required"
@@ -222,18 +251,28 @@ verify_deployment() {
         log_warning "Application configuration not found: $config_file"
     fi
     
-    # Wait for Wowza to fully start and check logs
-    sleep 5
-    
+    # Poll the log written since this start (see record_log_offset) until the module reports startup
     local access_log="$WOWZA_HOME/logs/wowzastreamingengine_access.log"
-    if [ -f "$access_log" ]; then
-        if tail -n 100 "$access_log" | grep -q "ModuleSCTE35SRTDetector.*started"; then
+    local max_attempts=15
+    local attempt=0
+    local offset
+    
+    while [ $attempt -lt $max_attempts ]; do
+        offset=$LOG_OFFSET
+        # The log was rotated since the offset was taken; everything in it is new
+        if [ -f "$access_log" ] && [ "$(wc -c < "$access_log")" -lt "$offset" ]; then
+            offset=0
+        fi
+        if [ -f "$access_log" ] && tail -c +$((offset + 1)) "$access_log" | grep -q "ModuleSCTE35SRTDetector.*started"; then
             log_success "Module successfully loaded (check logs for confirmation)"
-        else
-            log_warning "Module loading not detected in logs yet"
-            log_info "Monitor logs: tail -f $access_log | grep -i scte35"
+            return 0
         fi
-    fi
+        sleep 1
+        attempt=$((attempt + 1))
+    done
+    
+    log_warning "Module loading not detected in logs yet"
+    log_info "Monitor logs: tail -f $access_log | grep -i scte35"
 }
 
 # Run tests
@@ -286,6 +325,7 @@ main() {
     deploy_config
     echo
     
+    record_log_offset
     start_wowza
     echo
     
@@ -2,10 +2,10 @@ package com.mycompany.scte35;
 
 import com.wowza.wms.application.IApplicationInstance;
 import com.wowza.wms.application.WMSProperties;
+import com.wowza.wms.client.IClient;
 import com.wowza.wms.module.ModuleBase;
 import com.wowza.wms.stream.IMediaStream;
 import com.wowza.wms.stream.IMediaStreamNotify;
-import com.wowza.wms.stream.MediaStreamMap;
 import com.wowza.wms.stream.MediaStreamActionNotifyBase;
 
 import java.util.concurrent.ConcurrentHashMap;
@@ -14,7 +14,6 @@ import java.util.List;
 import java.util.ArrayList;
 import java.util.concurrent.atomic.AtomicLong;
 import java.util.Base64;
-import java.nio.ByteBuffer;
 
 public class ModuleSCTE35SRTDetector extends ModuleBase {
 
@@ -26,16 +25,14 @@ public class ModuleSCTE35SRTDetector extends ModuleBase {
     private static final byte SPLICE_INSERT_COMMAND = 0x05;
     private static final byte TIME_SIGNAL_COMMAND = 0x06;
     
-    private IApplicationInstance appInstance;
     private Map<String, SCTE35StreamHandler> streamHandlers;
     private boolean debugMode = false;
     private List<Integer> configuredSCTE35PIDs;
-    private AtomicLong totalSRTStreamsDetected = new AtomicLong(0);
-    private AtomicLong totalSCTE35EventsDetected = new AtomicLong(0);
-    private volatile boolean monitoring = false;
+    private boolean[] monitoredPIDs = new boolean[0x2000];
+    private final AtomicLong totalSRTStreamsDetected = new AtomicLong(0);
+    private final AtomicLong totalSCTE35EventsDetected = new AtomicLong(0);
     
     public void onAppStart(IApplicationInstance appInstance) {
-        this.appInstance = appInstance;
         this.streamHandlers = new ConcurrentHashMap<>();
         this.configuredSCTE35PIDs = new ArrayList<>();
         
@@ -60,10 +57,9 @@ public class ModuleSCTE35SRTDetector extends ModuleBase {
     }
     
     public void onAppStop(IApplicationInstance appInstance) {
-        monitoring = false;
-        
         if (streamHandlers != null) {
             for (SCTE35StreamHandler handler : streamHandlers.values()) {
+                handler.detachPacketProcessor();
                 handler.stopMonitoring();
             }
             streamHandlers.clear();
@@ -82,12 +78,18 @@ public class ModuleSCTE35SRTDetector extends ModuleBase {
             if (isSRTStream(stream)) {
                 getLogger().info(MODULE_NAME + ": SRT stream detected: " + streamName + ", starting real SCTE-35 detection");
                 
-                SCTE35StreamHandler handler = new SCTE35StreamHandler(streamName);
-                streamHandlers.put(streamName, handler);
-                totalSRTStreamsDetected.incrementAndGet();
-                
-                stream.addClientListener(new SRTPacketProcessor(handler));
+                // Attach before publishing the handler so a concurrent unpublish always finds it fully set up
+                SCTE35StreamHandler handler = new SCTE35StreamHandler(streamName, stream);
+                handler.attachPacketProcessor();
                 handler.startMonitoring();
+                
+                SCTE35StreamHandler previous = streamHandlers.put(streamName, handler);
+                if (previous != null) {
+                    getLogger().info(MODULE_NAME + ": Replacing existing SCTE-35 handler for republished stream: " + streamName);
+                    previous.detachPacketProcessor();
+                    previous.stopMonitoring();
+                }
+                totalSRTStreamsDetected.incrementAndGet();
             } else {
                 if (debugMode) {
                     getLogger().info(MODULE_NAME + ": Ignoring non-SRT stream: " + streamName);
@@ -96,8 +98,10 @@ public class ModuleSCTE35SRTDetector extends ModuleBase {
         }
         
         public void onUnPublish(IMediaStream stream, String streamName, boolean isLive, boolean isRecord, boolean isAppend) {
-            SCTE35StreamHandler handler = streamHandlers.remove(streamName);
-            if (handler != null) {
+            SCTE35StreamHandler handler = streamHandlers.get(streamName);
+            // A late unpublish for a stream that has since been republished must not stop the new handler
+            if (handler != null && handler.getStream() == stream && streamHandlers.remove(streamName, handler)) {
+                handler.detachPacketProcessor();
                 handler.stopMonitoring();
                 getLogger().info(MODULE_NAME + ": SRT stream unpublished: " + streamName);
             }
@@ -118,15 +122,13 @@ public class ModuleSCTE35SRTDetector extends ModuleBase {
     
     
     private boolean isSRTStream(IMediaStream stream) {
-        if (stream == null || stream.getClient() == null) {
+        IClient client = (stream != null) ? stream.getClient() : null;
+        if (client == null) {
             return false;
         }
         
-        String protocol = "unknown";
-        if (stream.getClient() != null) {
-            Object protocolObj = stream.getClient().getProtocol();
-            protocol = (protocolObj != null) ? protocolObj.toString() : "unknown";
-        }
+        Object protocolObj = client.getProtocol();
+        String protocol = (protocolObj != null) ? protocolObj.toString() : "unknown";
         if (debugMode) {
             getLogger().info(MODULE_NAME + ": Stream protocol detected: " + protocol + " for stream: " + (stream.getName() != null ? stream.getName() : "unknown"));
         }
@@ -134,14 +136,19 @@ public class ModuleSCTE35SRTDetector extends ModuleBase {
         return "srt".equalsIgnoreCase(protocol) || "udp".equalsIgnoreCase(protocol);
     }
     
-    private class SRTPacketProcessor extends MediaStreamActionNotifyBase {
+    private class SRTPacketProcessor extends MediaStreamActionNotifyBase implements SCTE35SectionAssembler.SectionListener {
         private final SCTE35StreamHandler handler;
+        private final SCTE35SectionAssembler sectionAssembler = new SCTE35SectionAssembler(this);
         
         public SRTPacketProcessor(SCTE35StreamHandler handler) {
             this.handler = handler;
         }
         
         public void onAction(IMediaStream stream, String actionName, WMSProperties actionParams) {
+            if (!handler.isMonitoring()) {
+                return;
+            }
+            
             if ("onRTPPacket".equals(actionName) && actionParams != null) {
                 byte[] packetData = (byte[]) actionParams.get("packetData");
                 if (packetData != null && packetData.length >= 188) {
@@ -154,64 +161,82 @@ public class ModuleSCTE35SRTDetector extends ModuleBase {
             int offset = 0;
             
             while (offset + 188 <= srtData.length) {
-                byte[] tsPacket = new byte[188];
-                System.arraycopy(srtData, offset, tsPacket, 0, 188);
-                
-                if (isValidTSPacket(tsPacket)) {
-                    processTSPacket(tsPacket);
+                if (isValidTSPacket(srtData, offset)) {
+                    processTSPacket(srtData, offset);
                 }
                 
                 offset += 188;
             }
         }
         
-        private boolean isValidTSPacket(byte[] tsPacket) {
-            return tsPacket.length == 188 && tsPacket[0] == 0x47;
+        private boolean isValidTSPacket(byte[] data, int offset) {
+            return data[offset] == 0x47;
         }
         
-        private void processTSPacket(byte[] tsPacket) {
-            int pid = extractPID(tsPacket);
+        private void processTSPacket(byte[] data, int offset) {
+            int pid = extractPID(data, offset);
             
-            if (configuredSCTE35PIDs.contains(pid)) {
+            if (monitoredPIDs[pid]) {
                 if (debugMode) {
-                    getLogger().info(MODULE_NAME + ": SCTE-35 PID detected: 0x" + String.format("%04X", pid) + 
+                    getLogger().info(MODULE_NAME + ": SCTE-35 PID detected: " + formatPID(pid) + 
                                    " in stream: " + handler.getStreamName());
                 }
                 
-                byte[] payload = extractTSPayload(tsPacket);
-                if (payload != null && payload.length > 0) {
-                    parseSCTE35Section(payload);
+                int payloadStart = findPayloadStart(data, offset);
+                if (payloadStart >= 0) {
+                    boolean payloadUnitStart = (data[offset + 1] & 0x40) != 0;
+                    int continuityCounter = data[offset + 3] & 0x0F;
+                    sectionAssembler.assemble(data, payloadStart, offset + 188, payloadUnitStart, continuityCounter, pid);
                 }
             }
         }
         
-        private int extractPID(byte[] tsPacket) {
-            return ((tsPacket[1] & 0x1F) << 8) | (tsPacket[2] & 0xFF);
+        private int extractPID(byte[] data, int offset) {
+            return ((data[offset + 1] & 0x1F) << 8) | (data[offset + 2] & 0xFF);
         }
         
-        private byte[] extractTSPayload(byte[] tsPacket) {
-            int adaptationFieldControl = (tsPacket[3] & 0x30) >> 4;
+        private int findPayloadStart(byte[] data, int offset) {
+            int adaptationFieldControl = (data[offset + 3] & 0x30) >> 4;
             int payloadStart = 4;
             
             if (adaptationFieldControl == 2) {
-                return null;
+                return -1;
             }
             
             if (adaptationFieldControl == 3) {
-                int adaptationFieldLength = tsPacket[4] & 0xFF;
+                int adaptationFieldLength = data[offset + 4] & 0xFF;
                 payloadStart = 5 + adaptationFieldLength;
             }
             
-            if (payloadStart >= tsPacket.length) {
-                return null;
+            if (payloadStart >= 188) {
+                return -1;
             }
             
-            byte[] payload = new byte[tsPacket.length - payloadStart];
-            System.arraycopy(tsPacket, payloadStart, payload, 0, payload.length);
-            return payload;
+            return offset + payloadStart;
+        }
+        
+        @Override
+        public void onSection(byte[] section, int pid) {
+            parseSCTE35Section(section, pid);
+        }
+        
+        @Override
+        public void onRepeatedSection(int pid) {
+            if (debugMode) {
+                getLogger().info(MODULE_NAME + ": Skipping repeated SCTE-35 section on PID " + formatPID(pid) + 
+                               " in stream: " + handler.getStreamName());
+            }
+        }
+        
+        @Override
+        public void onCorruptSection(int pid) {
+            if (debugMode) {
+                getLogger().warn(MODULE_NAME + ": Dropping SCTE-35 section with bad CRC_32 on PID " + formatPID(pid) + 
+                               " in stream: " + handler.getStreamName());
+            }
         }
         
-        private void parseSCTE35Section(byte[] payload) {
+        private void parseSCTE35Section(byte[] payload, int pid) {
             if (payload.length < 14) {
                 return;
             }
@@ -234,10 +259,10 @@ public class ModuleSCTE35SRTDetector extends ModuleBase {
                 return;
             }
             
-            parseSCTE35Command(payload);
+            parseSCTE35Command(payload, pid);
         }
         
-        private void parseSCTE35Command(byte[] scte35Data) {
+        private void parseSCTE35Command(byte[] scte35Data, int pid) {
             if (scte35Data.length < 14) {
                 return;
             }
@@ -246,7 +271,7 @@ public class ModuleSCTE35SRTDetector extends ModuleBase {
             SCTE35Event event = new SCTE35Event();
             event.timestamp = System.currentTimeMillis();
             event.streamName = handler.getStreamName();
-            event.pid = 0x1F00;
+            event.pid = pid;
             event.commandType = (byte) commandType;
             event.rawData = scte35Data;
             
@@ -271,16 +296,22 @@ public class ModuleSCTE35SRTDetector extends ModuleBase {
         }
         
         private void parseSpliceInsert(byte[] data, SCTE35Event event) {
-            if (data.length < 18) return;
+            if (data.length < 19) return;
             
             event.eventId = ((data[14] & 0xFF) << 24) | ((data[15] & 0xFF) << 16) | 
                            ((data[16] & 0xFF) << 8) | (data[17] & 0xFF);
-            event.outOfNetworkIndicator = (data[18] & 0x80) != 0;
-            event.durationFlag = (data[18] & 0x40) != 0;
+            event.spliceEventCancelIndicator = (data[18] & 0x80) != 0;
+            
+            // The flags byte is only present when the event is not being cancelled
+            if (event.spliceEventCancelIndicator || data.length < 20) return;
+            
+            event.outOfNetworkIndicator = (data[19] & 0x80) != 0;
+            event.programSpliceFlag = (data[19] & 0x40) != 0;
+            event.durationFlag = (data[19] & 0x20) != 0;
         }
         
         private void parseTimeSignal(byte[] data, SCTE35Event event) {
-            event.eventId = (int) (System.currentTimeMillis() % 100000);
+            event.eventId = (int) (event.timestamp % 100000);
         }
     }
     
@@ -311,25 +342,57 @@ public class ModuleSCTE35SRTDetector extends ModuleBase {
         if (configuredSCTE35PIDs.isEmpty()) {
             configuredSCTE35PIDs.add(SCTE35_PID);
         }
+        
+        boolean[] pidTable = new boolean[0x2000];
+        for (int pid : configuredSCTE35PIDs) {
+            pidTable[pid] = true;
+        }
+        monitoredPIDs = pidTable;
+    }
+    
+    private static String formatPID(int pid) {
+        String hex = Integer.toHexString(pid).toUpperCase();
+        if (hex.length() >= 4) {
+            return "0x" + hex;
+        }
+        return "0x" + "0000".substring(hex.length()) + hex;
     }
     
     private class SCTE35StreamHandler {
         private final String streamName;
+        private final IMediaStream stream;
         private volatile boolean streamMonitoring = false;
         private final AtomicLong scte35EventsDetected = new AtomicLong(0);
-        private List<SCTE35Event> detectedEvents;
-        private long startTime;
+        private final long startTime;
+        private final SRTPacketProcessor packetProcessor;
         
-        public SCTE35StreamHandler(String streamName) {
+        public SCTE35StreamHandler(String streamName, IMediaStream stream) {
             this.streamName = streamName;
-            this.detectedEvents = new ArrayList<>();
+            this.stream = stream;
             this.startTime = System.currentTimeMillis();
+            this.packetProcessor = new SRTPacketProcessor(this);
         }
         
         public String getStreamName() {
             return streamName;
         }
         
+        public boolean isMonitoring() {
+            return streamMonitoring;
+        }
+        
+        public IMediaStream getStream() {
+            return stream;
+        }
+        
+        public void attachPacketProcessor() {
+            stream.addClientListener(packetProcessor);
+        }
+        
+        public void detachPacketProcessor() {
+            stream.removeClientListener(packetProcessor);
+        }
+        
         public void startMonitoring() {
             streamMonitoring = true;
             getLogger().info(MODULE_NAME + ": Started real SCTE-35 monitoring for SRT stream: " + streamName);
@@ -348,20 +411,13 @@ public class ModuleSCTE35SRTDetector extends ModuleBase {
         public void recordRealSCTE35Event(SCTE35Event event) {
             if (!streamMonitoring) return;
             
-            synchronized (detectedEvents) {
-                detectedEvents.add(event);
-                if (detectedEvents.size() > 50) {
-                    detectedEvents.remove(0);
-                }
-            }
-            
-            scte35EventsDetected.incrementAndGet();
+            long streamEventCount = scte35EventsDetected.incrementAndGet();
             totalSCTE35EventsDetected.incrementAndGet();
             
             getLogger().warn(MODULE_NAME + ": REAL SCTE-35 Event detected in SRT stream '" + streamName + 
                            "' - Type: " + event.eventType + 
                            ", Event ID: " + event.eventId + 
-                           ", PID: 0x" + String.format("%04X", event.pid) +
+                           ", PID: " + formatPID(event.pid) +
                            ", Timestamp: " + event.timestamp +
                            (event.outOfNetworkIndicator ? " [OUT_OF_NETWORK]" : "") +
                            (event.durationFlag ? " [HAS_DURATION]" : ""));
@@ -371,16 +427,18 @@ public class ModuleSCTE35SRTDetector extends ModuleBase {
                 getLogger().info(MODULE_NAME + ": SCTE-35 Raw Data (Hex): " + event.getHexData());
             }
             
-            if (scte35EventsDetected.get() % 5 == 0) {
+            if (streamEventCount % 5 == 0) {
                 getLogger().info(MODULE_NAME + ": Stream '" + streamName + "' Statistics - " +
-                               "REAL SCTE-35 Events: " + scte35EventsDetected.get() + 
-                               ", Monitoring Duration: " + ((System.currentTimeMillis() - startTime) / 1000) + "s");
+                               "REAL SCTE-35 Events: " + streamEventCount + 
+                               ", Monitoring Duration: " + ((event.timestamp - startTime) / 1000) + "s");
             }
         }
         
     }
     
     public static class SCTE35Event {
+        private static final char[] HEX_DIGITS = "0123456789ABCDEF".toCharArray();
+        
         public long timestamp;
         public String streamName;
         public int pid;
@@ -404,11 +462,14 @@ public class ModuleSCTE35SRTDetector extends ModuleBase {
         
         public String getHexData() {
             if (rawData != null) {
-                StringBuilder hex = new StringBuilder();
+                StringBuilder hex = new StringBuilder(rawData.length * 3);
                 for (byte b : rawData) {
-                    hex.append(String.format("%02X ", b & 0xFF));
+                    if (hex.length() > 0) {
+                        hex.append(' ');
+                    }
+                    hex.append(HEX_DIGITS[(b >> 4) & 0x0F]).append(HEX_DIGITS[b & 0x0F]);
                 }
-                return hex.toString().trim();
+                return hex.toString();
             }
             return "";
         }
@@ -418,7 +479,7 @@ public class ModuleSCTE35SRTDetector extends ModuleBase {
             return "SCTE35Event{" +
                    "timestamp=" + timestamp +
                    ", streamName='" + streamName + '\'' +
-                   ", pid=0x" + String.format("%04X", pid) +
+                   ", pid=" + formatPID(pid) +
                    ", commandType=" + commandType +
                    ", eventType='" + eventType + '\'' +
                    ", eventId=" + eventId +
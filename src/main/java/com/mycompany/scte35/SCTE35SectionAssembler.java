@@ -0,0 +1,141 @@
+package com.mycompany.scte35;
+
+import java.util.Arrays;
+
+/**
+ * Reassembles SCTE-35 splice_info_sections from MPEG-TS packet payloads.
+ * Honours pointer_field on payload_unit_start packets, collects sections that
+ * span several packets and stops at 0xFF stuffing. A partial section is
+ * dropped when the continuity_counter shows a lost packet, and complete
+ * sections must pass the MPEG-2 CRC_32 check. State is kept per PID,
+ * including the last section seen so that carousel repeats are reported
+ * without being copied again.
+ */
+class SCTE35SectionAssembler {
+
+    interface SectionListener {
+        void onSection(byte[] section, int pid);
+
+        default void onRepeatedSection(int pid) {}
+
+        default void onCorruptSection(int pid) {}
+    }
+
+    private static final int MAX_SECTION_SIZE = 3 + 0xFFF;
+    private static final int[] CRC_TABLE = buildCrcTable();
+
+    private final SectionBuffer[] sectionBuffers = new SectionBuffer[0x2000];
+    private final SectionListener listener;
+
+    SCTE35SectionAssembler(SectionListener listener) {
+        this.listener = listener;
+    }
+
+    void assemble(byte[] data, int start, int end, boolean payloadUnitStart, int continuityCounter, int pid) {
+        SectionBuffer buffer = sectionBuffers[pid];
+        if (buffer == null) {
+            buffer = new SectionBuffer();
+            sectionBuffers[pid] = buffer;
+        }
+
+        int lastCounter = buffer.continuityCounter;
+        buffer.continuityCounter = continuityCounter;
+        if (lastCounter >= 0 && continuityCounter != ((lastCounter + 1) & 0x0F)) {
+            if (continuityCounter == lastCounter) {
+                // Duplicate packet: its payload has already been consumed
+                return;
+            }
+            // A packet was lost; whatever was collected so far cannot be completed
+            buffer.length = 0;
+        }
+
+        int position = start;
+
+        if (payloadUnitStart) {
+            int pointerField = data[start] & 0xFF;
+            int sectionStart = Math.min(start + 1 + pointerField, end);
+
+            // Bytes before the pointer target finish the section started in an earlier packet
+            if (buffer.length > 0) {
+                appendToSection(buffer, data, start + 1, sectionStart, pid);
+            }
+            buffer.length = 0;
+            position = sectionStart;
+        } else if (buffer.length == 0) {
+            return;
+        }
+
+        while (position < end) {
+            if (buffer.length == 0 && (data[position] & 0xFF) == 0xFF) {
+                return;
+            }
+            position = appendToSection(buffer, data, position, end, pid);
+        }
+    }
+
+    private int appendToSection(SectionBuffer buffer, byte[] data, int position, int limit, int pid) {
+        while (position < limit) {
+            int count = Math.min(buffer.expectedLength() - buffer.length, limit - position);
+            System.arraycopy(data, position, buffer.data, buffer.length, count);
+            buffer.length += count;
+            position += count;
+
+            if (buffer.length >= 3 && buffer.length == buffer.expectedLength()) {
+                completeSection(buffer, pid);
+                buffer.length = 0;
+                break;
+            }
+        }
+        return position;
+    }
+
+    private void completeSection(SectionBuffer buffer, int pid) {
+        if (buffer.length < 4 || crc32(buffer.data, 0, buffer.length) != 0) {
+            listener.onCorruptSection(pid);
+            return;
+        }
+
+        byte[] lastSection = buffer.lastSection;
+        if (lastSection != null && Arrays.equals(lastSection, 0, lastSection.length, buffer.data, 0, buffer.length)) {
+            listener.onRepeatedSection(pid);
+            return;
+        }
+        buffer.lastSection = Arrays.copyOf(buffer.data, buffer.length);
+        listener.onSection(buffer.lastSection, pid);
+    }
+
+    /** MPEG-2 CRC-32; running it over a section including its CRC_32 field yields 0. */
+    static int crc32(byte[] data, int offset, int length) {
+        int crc = 0xFFFFFFFF;
+        for (int i = offset; i < offset + length; i++) {
+            crc = (crc << 8) ^ CRC_TABLE[((crc >>> 24) ^ data[i]) & 0xFF];
+        }
+        return crc;
+    }
+
+    private static int[] buildCrcTable() {
+        int[] table = new int[256];
+        for (int i = 0; i < 256; i++) {
+            int crc = i << 24;
+            for (int bit = 0; bit < 8; bit++) {
+                crc = (crc & 0x80000000) != 0 ? (crc << 1) ^ 0x04C11DB7 : crc << 1;
+            }
+            table[i] = crc;
+        }
+        return table;
+    }
+
+    private static class SectionBuffer {
+        private final byte[] data = new byte[MAX_SECTION_SIZE];
+        private int length;
+        private int continuityCounter = -1;
+        private byte[] lastSection;
+
+        private int expectedLength() {
+            if (length < 3) {
+                return 3;
+            }
+            return 3 + (((data[1] & 0x0F) << 8) | (data[2] & 0xFF));
+        }
+    }
+}
@@ -0,0 +1,304 @@
+package com.mycompany.scte35;
+
+import static org.junit.Assert.assertArrayEquals;
+import static org.junit.Assert.assertEquals;
+
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.HashMap;
+import java.util.List;
+import java.util.Map;
+
+import org.junit.Before;
+import org.junit.Test;
+
+public class SCTE35SectionAssemblerTest {
+
+    private static final int PAYLOAD_SIZE = 184;
+    private static final int PID = 0x1F00;
+
+    private final List<byte[]> sections = new ArrayList<>();
+    private final List<Integer> pids = new ArrayList<>();
+    private final List<Integer> repeatedPids = new ArrayList<>();
+    private final List<Integer> corruptPids = new ArrayList<>();
+    private final Map<Integer, Integer> continuityCounters = new HashMap<>();
+    private SCTE35SectionAssembler assembler;
+
+    @Before
+    public void setUp() {
+        assembler = new SCTE35SectionAssembler(new SCTE35SectionAssembler.SectionListener() {
+            @Override
+            public void onSection(byte[] section, int pid) {
+                sections.add(section);
+                pids.add(pid);
+            }
+
+            @Override
+            public void onRepeatedSection(int pid) {
+                repeatedPids.add(pid);
+            }
+
+            @Override
+            public void onCorruptSection(int pid) {
+                corruptPids.add(pid);
+            }
+        });
+    }
+
+    @Test
+    public void singlePacketSection() {
+        byte[] section = section(30, 1);
+
+        feed(payload(bytes(0), section), true, PID);
+
+        assertEquals(1, sections.size());
+        assertArrayEquals(section, sections.get(0));
+        assertEquals(Integer.valueOf(PID), pids.get(0));
+    }
+
+    @Test
+    public void sectionSpanningPackets() {
+        byte[] section = section(300, 1);
+
+        feed(payload(bytes(0), slice(section, 0, 183)), true, PID);
+        assertEquals(0, sections.size());
+        feed(payload(slice(section, 183, section.length)), false, PID);
+
+        assertEquals(1, sections.size());
+        assertArrayEquals(section, sections.get(0));
+    }
+
+    @Test
+    public void pointerFieldTailCompletesPreviousSection() {
+        byte[] first = section(250, 1);
+        byte[] second = section(40, 2);
+        byte[] tail = slice(first, 183, first.length);
+
+        feed(payload(bytes(0), slice(first, 0, 183)), true, PID);
+        feed(payload(bytes(tail.length), tail, second), true, PID);
+
+        assertEquals(2, sections.size());
+        assertArrayEquals(first, sections.get(0));
+        assertArrayEquals(second, sections.get(1));
+    }
+
+    @Test
+    public void backToBackSectionsInOnePayload() {
+        byte[] first = section(30, 1);
+        byte[] second = section(50, 2);
+
+        feed(payload(bytes(0), first, second), true, PID);
+
+        assertEquals(2, sections.size());
+        assertArrayEquals(first, sections.get(0));
+        assertArrayEquals(second, sections.get(1));
+    }
+
+    @Test
+    public void sectionHeaderSplitAcrossPackets() {
+        byte[] section = section(60, 1);
+        int pointer = PAYLOAD_SIZE - 1 - 2;
+
+        feed(payload(bytes(pointer), new byte[pointer], slice(section, 0, 2)), true, PID);
+        feed(payload(slice(section, 2, section.length)), false, PID);
+
+        assertEquals(1, sections.size());
+        assertArrayEquals(section, sections.get(0));
+    }
+
+    @Test
+    public void lostContinuationDiscardsPartialSection() {
+        byte[] partial = section(300, 1);
+        byte[] next = section(40, 2);
+
+        feed(payload(bytes(0), slice(partial, 0, 183)), true, PID);
+        feed(payload(bytes(0), next), true, PID);
+
+        assertEquals(1, sections.size());
+        assertArrayEquals(next, sections.get(0));
+    }
+
+    @Test
+    public void continuationWithoutStartIsIgnored() {
+        byte[] section = section(30, 1);
+
+        feed(payload(section), false, PID);
+
+        assertEquals(0, sections.size());
+    }
+
+    @Test
+    public void interleavedPidsAreAssembledIndependently() {
+        byte[] first = section(300, 1);
+        byte[] second = section(300, 2);
+
+        feed(payload(bytes(0), slice(first, 0, 183)), true, 0x1F00);
+        feed(payload(bytes(0), slice(second, 0, 183)), true, 0x1F01);
+        feed(payload(slice(first, 183, first.length)), false, 0x1F00);
+        feed(payload(slice(second, 183, second.length)), false, 0x1F01);
+
+        assertEquals(2, sections.size());
+        assertArrayEquals(first, sections.get(0));
+        assertEquals(Integer.valueOf(0x1F00), pids.get(0));
+        assertArrayEquals(second, sections.get(1));
+        assertEquals(Integer.valueOf(0x1F01), pids.get(1));
+    }
+
+    @Test
+    public void repeatedSectionIsReportedNotDelivered() {
+        byte[] section = section(30, 1);
+
+        feed(payload(bytes(0), section), true, PID);
+        feed(payload(bytes(0), section), true, PID);
+
+        assertEquals(1, sections.size());
+        assertEquals(1, repeatedPids.size());
+        assertEquals(Integer.valueOf(PID), repeatedPids.get(0));
+    }
+
+    @Test
+    public void repeatsAreTrackedPerPid() {
+        byte[] first = section(30, 1);
+        byte[] second = section(30, 2);
+
+        feed(payload(bytes(0), first), true, 0x1F00);
+        feed(payload(bytes(0), second), true, 0x1F01);
+        feed(payload(bytes(0), first), true, 0x1F00);
+        feed(payload(bytes(0), second), true, 0x1F01);
+
+        assertEquals(2, sections.size());
+        assertArrayEquals(first, sections.get(0));
+        assertArrayEquals(second, sections.get(1));
+        assertEquals(Arrays.asList(0x1F00, 0x1F01), repeatedPids);
+    }
+
+    @Test
+    public void changedSectionIsDeliveredAgain() {
+        byte[] first = section(30, 1);
+        byte[] second = section(30, 2);
+
+        feed(payload(bytes(0), first), true, PID);
+        feed(payload(bytes(0), second), true, PID);
+        feed(payload(bytes(0), first), true, PID);
+
+        assertEquals(3, sections.size());
+        assertEquals(0, repeatedPids.size());
+    }
+
+    @Test
+    public void droppedMiddleContinuationDiscardsSection() {
+        byte[] section = section(450, 1);
+
+        feed(payload(bytes(0), slice(section, 0, 183)), true, PID);
+        skipPacket(PID);
+        feed(payload(slice(section, 367, section.length)), false, PID);
+
+        assertEquals(0, sections.size());
+    }
+
+    @Test
+    public void sectionAfterDroppedPacketIsStillAssembled() {
+        byte[] lost = section(450, 1);
+        byte[] next = section(40, 2);
+
+        feed(payload(bytes(0), slice(lost, 0, 183)), true, PID);
+        skipPacket(PID);
+        feed(payload(slice(lost, 367, lost.length)), false, PID);
+        feed(payload(bytes(0), next), true, PID);
+
+        assertEquals(1, sections.size());
+        assertArrayEquals(next, sections.get(0));
+    }
+
+    @Test
+    public void duplicatePacketIsIgnored() {
+        byte[] section = section(300, 1);
+        byte[] head = payload(bytes(0), slice(section, 0, 183));
+
+        feed(head, true, PID);
+        assembler.assemble(head, 0, head.length, true, continuityCounters.get(PID), PID);
+        feed(payload(slice(section, 183, section.length)), false, PID);
+
+        assertEquals(1, sections.size());
+        assertArrayEquals(section, sections.get(0));
+    }
+
+    @Test
+    public void sectionWithBadCrcIsRejected() {
+        byte[] section = section(30, 1);
+        section[20] ^= 0x01;
+
+        feed(payload(bytes(0), section), true, PID);
+
+        assertEquals(0, sections.size());
+        assertEquals(Arrays.asList(PID), corruptPids);
+    }
+
+    private void feed(byte[] payload, boolean payloadUnitStart, int pid) {
+        assembler.assemble(payload, 0, payload.length, payloadUnitStart, nextContinuityCounter(pid), pid);
+    }
+
+    private void skipPacket(int pid) {
+        nextContinuityCounter(pid);
+    }
+
+    private int nextContinuityCounter(int pid) {
+        int counter = (continuityCounters.getOrDefault(pid, -1) + 1) & 0x0F;
+        continuityCounters.put(pid, counter);
+        return counter;
+    }
+
+    /** Builds a splice_info_section of the given total length with a recognisable body and a valid CRC_32. */
+    private static byte[] section(int totalLength, int marker) {
+        byte[] section = new byte[totalLength];
+        int sectionLength = totalLength - 3;
+        section[0] = (byte) 0xFC;
+        section[1] = (byte) (0x30 | ((sectionLength >> 8) & 0x0F));
+        section[2] = (byte) (sectionLength & 0xFF);
+        for (int i = 3; i < totalLength - 4; i++) {
+            section[i] = (byte) ((i + marker) % 0xFF);
+        }
+        int crc = mpegCrc32(section, totalLength - 4);
+        section[totalLength - 4] = (byte) (crc >>> 24);
+        section[totalLength - 3] = (byte) (crc >>> 16);
+        section[totalLength - 2] = (byte) (crc >>> 8);
+        section[totalLength - 1] = (byte) crc;
+        return section;
+    }
+
+    /** Bit-by-bit MPEG-2 CRC-32, independent of the table-driven implementation under test. */
+    private static int mpegCrc32(byte[] data, int length) {
+        int crc = 0xFFFFFFFF;
+        for (int i = 0; i < length; i++) {
+            crc ^= (data[i] & 0xFF) << 24;
+            for (int bit = 0; bit < 8; bit++) {
+                crc = (crc & 0x80000000) != 0 ? (crc << 1) ^ 0x04C11DB7 : crc << 1;
+            }
+        }
+        return crc;
+    }
+
+    /** Concatenates the parts and pads the result to a full TS payload with 0xFF stuffing. */
+    private static byte[] payload(byte[]... parts) {
+        byte[] payload = new byte[PAYLOAD_SIZE];
+        Arrays.fill(payload, (byte) 0xFF);
+        int position = 0;
+        for (byte[] part : parts) {
+            System.arraycopy(part, 0, payload, position, part.length);
+            position += part.length;
+        }
+        return payload;
+    }
+
+    private static byte[] bytes(int... values) {
+        byte[] result = new byte[values.length];
+        for (int i = 0; i < values.length; i++) {
+            result[i] = (byte) values[i];
+        }
+        return result;
+    }
+
+    private static byte[] slice(byte[] data, int from, int to) {
+        return Arrays.copyOfRange(data, from, to);
+    }
+}